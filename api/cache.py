@@ -0,0 +1,91 @@
+import time
+import hashlib
+import orjson
+import logging
+import functools
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from redis import asyncio as redis
+from redis.exceptions import RedisError
+from sqlalchemy import text
+
+from . import database
+from .config import settings
+
+logger = logging.getLogger("MedicalAPI")
+
+client = redis.from_url(settings.redis_url)
+
+# How long the data version is reused before re-checking Postgres
+DATA_VERSION_TTL = 60
+
+# Changes whenever dbt publishes new messages or new image detections
+DATA_VERSION_SQL = text("""
+    SELECT
+        (SELECT max(loaded_at) FROM "raw".fct_messages),
+        (SELECT max(detected_at) FROM "raw".fct_image_detections)
+""")
+
+_data_version = None
+_data_version_expires = 0.0
+
+
+def cache(ttl: int, key: str):
+    """
+    Caches an endpoint's JSON body in Redis for `ttl` seconds.
+    `key` is formatted with the endpoint's keyword arguments, e.g. "top-products:{limit}",
+    and prefixed with the current data version so a new load never serves an old body.
+    Hits return the stored bytes as-is; Redis or the version check being unavailable
+    never fails a request, it just falls through to the database.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            try:
+                version = await current_data_version()
+            except Exception as e:
+                logger.warning(f"Could not read data version, bypassing cache: {e}")
+                return await func(*args, **kwargs)
+
+            cache_key = f"{version}:{key.format(**kwargs)}"
+            try:
+                cached = await client.get(cache_key)
+                if cached is not None:
+                    return Response(content=cached, media_type="application/json")
+            except RedisError as e:
+                logger.warning(f"Cache read failed for {cache_key}: {e}")
+
+            # Endpoints may already return a pre-serialized JSON Response
+            result = await func(*args, **kwargs)
+            if isinstance(result, Response):
+                body = result.body
+            else:
+                body = orjson.dumps(jsonable_encoder(result))
+
+            try:
+                await client.setex(cache_key, ttl, body)
+            except RedisError as e:
+                logger.warning(f"Cache write failed for {cache_key}: {e}")
+            return Response(content=body, media_type="application/json")
+        return wrapper
+    return decorator
+
+
+async def current_data_version():
+    """
+    Returns a hash of the latest loaded_at in fct_messages and detected_at in
+    fct_image_detections. Cached in-process for DATA_VERSION_TTL seconds.
+    """
+    global _data_version, _data_version_expires
+    now = time.monotonic()
+    if _data_version is None or now >= _data_version_expires:
+        async with database.engine.connect() as conn:
+            latest = (await conn.execute(DATA_VERSION_SQL)).one()
+        _data_version = hashlib.md5(str(tuple(latest)).encode()).hexdigest()
+        _data_version_expires = now + DATA_VERSION_TTL
+    return _data_version
+
+
+async def current_etag():
+    """Returns a weak ETag for the warehouse's current data version."""
+    return f'W/"{await current_data_version()}"'
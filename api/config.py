@@ -0,0 +1,21 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    """API configuration, read once from the environment and .env."""
+
+    database_url: str
+    redis_url: str = "redis://localhost:6379/0"
+
+    # Connection pool sizing (overridable per deployment)
+    sqlalchemy_pool_size: int = 20
+    sqlalchemy_max_overflow: int = 30
+    sqlalchemy_pool_timeout: int = 30
+    sqlalchemy_pool_recycle: int = 1800
+
+    log_dir: str = "logs"
+
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+
+settings = Settings()
@@ -1,24 +1,29 @@
-import os
-from dotenv import load_dotenv
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
 
-# Load the variables from .env
-load_dotenv()
+from .config import settings
 
-DATABASE_URL = os.getenv("DATABASE_URL")
+# asyncpg driver so queries don't block the FastAPI event loop
+ASYNC_DATABASE_URL = settings.database_url.replace("postgresql://", "postgresql+asyncpg://", 1)
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# LIFO reuse keeps hot connections warm and lets idle overflow ones time out
+engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_size=settings.sqlalchemy_pool_size,
+    max_overflow=settings.sqlalchemy_max_overflow,
+    pool_timeout=settings.sqlalchemy_pool_timeout,
+    pool_recycle=settings.sqlalchemy_pool_recycle,
+    pool_pre_ping=True,
+    pool_use_lifo=True,
+    # Per-connection cache of asyncpg prepared statements
+    connect_args={"prepared_statement_cache_size": 250},
+)
+async_session = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
 
 Base = declarative_base()
 
 # Dependency to get a DB session for our API routes
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
\ No newline at end of file
+async def get_db():
+    async with async_session() as session:
+        yield session
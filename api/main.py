@@ -1,30 +1,104 @@
 from fastapi import FastAPI, Depends, Request, HTTPException, Query, Path, status
-from sqlalchemy.orm import Session
-from sqlalchemy import text
-from typing import List
+from fastapi.responses import ORJSONResponse, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text, bindparam, BigInteger, Integer, String
+from contextlib import asynccontextmanager
+from typing import List, Optional
 import logging
+import logging.handlers
+import queue
 import time
 import os
 
 # Import local modules
-from . import schemas, database
+from . import schemas, database, cache
+from .streaming import stream_json_array
 from .database import get_db
+from .config import settings
 
-# --- DIRECTORY SETUP ---
-if not os.path.exists("logs"):
-    os.makedirs("logs")
+# Report data is appended once a day, so cached results are safe for 24h
+REPORT_CACHE_TTL = 86400
+
+# Browsers and proxies may reuse GET responses for an hour, then revalidate by ETag
+HTTP_CACHE_CONTROL = "public, max-age=3600"
 
 # --- STRUCTURED LOGGING SETUP ---
+# Request handlers only enqueue records; a background listener thread
+# does the actual file/console writes so they never block the event loop
+log_queue = queue.Queue(-1)
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("logs/api_access.log"),
-        logging.StreamHandler()
-    ]
+    handlers=[logging.handlers.QueueHandler(log_queue)]
+)
+log_listener = logging.handlers.QueueListener(
+    log_queue,
+    # delay=True: the file is opened on first write, after lifespan has created the log dir
+    logging.handlers.RotatingFileHandler(
+        os.path.join(settings.log_dir, "api_access.log"), maxBytes=50_000_000, backupCount=5, delay=True
+    ),
+    logging.StreamHandler()
 )
 logger = logging.getLogger("MedicalAPI")
 
+# --- SQL STATEMENTS ---
+# Built once at import so SQLAlchemy and asyncpg can reuse the compiled statements;
+# typed bind params skip per-request type inference
+# Postgres builds the JSON array itself, so no per-row dicts are created in Python
+TOP_PRODUCTS_SQL = text("""
+    SELECT json_agg(t)::TEXT
+    FROM (
+        SELECT term, mention_count
+        FROM "raw".mv_top_products
+        ORDER BY mention_count DESC
+        LIMIT :limit
+    ) t
+""").bindparams(bindparam("limit", type_=Integer))
+
+CHANNEL_ACTIVITY_SQL = text("""
+    SELECT day, post_count, daily_views
+    FROM "raw".mv_channel_activity
+    WHERE channel_name = :channel_name
+    ORDER BY day DESC
+""").bindparams(bindparam("channel_name", type_=String))
+
+SEARCH_MESSAGES_BASE = """
+    SELECT 
+        message_id,
+        date_key,
+        TO_DATE(date_key::TEXT, 'YYYYMMDD') AS date,
+        message_text,
+        COALESCE(view_count, 0) AS view_count
+    FROM "raw".fct_messages
+    WHERE message_text ILIKE :search_term
+    {cursor_filter}
+    ORDER BY date_key DESC, message_id DESC
+    LIMIT :limit
+"""
+
+SEARCH_MESSAGES_SQL = text(
+    SEARCH_MESSAGES_BASE.format(cursor_filter="")
+).bindparams(
+    bindparam("search_term", type_=String),
+    bindparam("limit", type_=Integer)
+)
+
+# Keyset pagination: resume after the cursor row instead of scanning past an OFFSET
+SEARCH_MESSAGES_AFTER_SQL = text(
+    SEARCH_MESSAGES_BASE.format(cursor_filter="AND (date_key, message_id) < (:after_date_key, :after_message_id)")
+).bindparams(
+    bindparam("search_term", type_=String),
+    bindparam("after_date_key", type_=Integer),
+    bindparam("after_message_id", type_=BigInteger),
+    bindparam("limit", type_=Integer)
+)
+
+VISUAL_STATS_SQL = text("""
+    SELECT channel_name, total_images, primary_category, avg_confidence
+    FROM "raw".mv_visual_stats
+    ORDER BY total_images DESC
+""")
+
 # --- API METADATA FOR DOCUMENTATION ---
 tags_metadata = [
     {"name": "General", "description": "Root and health check operations."},
@@ -33,6 +107,18 @@ tags_metadata = [
     {"name": "Search", "description": "Keyword-based message retrieval."},
 ]
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup work runs once per worker instead of at import time
+    os.makedirs(settings.log_dir, exist_ok=True)
+    log_listener.start()
+    yield
+    # Close pooled connections cleanly on shutdown
+    await database.engine.dispose()
+    await cache.client.aclose()
+    # Flush any queued log records before the process exits
+    log_listener.stop()
+
 app = FastAPI(
     title="Pharmaceutical Sales & Visual Analytics API",
     description="""
@@ -44,15 +130,42 @@ app = FastAPI(
     * **Search**: Look up specific drugs or medical terms in historical messages.
     """,
     version="1.0.0",
-    openapi_tags=tags_metadata
+    openapi_tags=tags_metadata,
+    lifespan=lifespan,
+    # orjson serializes response bodies several times faster than stdlib json
+    default_response_class=ORJSONResponse
 )
 
+# --- HTTP CACHING MIDDLEWARE ---
+# Registered before the logging middleware so 304s are still logged
+@app.middleware("http")
+async def conditional_get(request: Request, call_next):
+    if request.method != "GET" or not request.url.path.startswith("/api/"):
+        return await call_next(request)
+
+    try:
+        etag = await cache.current_etag()
+    except Exception as e:
+        logger.warning(f"Could not compute ETag, serving without cache headers: {e}")
+        return await call_next(request)
+
+    headers = {"ETag": etag, "Cache-Control": HTTP_CACHE_CONTROL}
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]:
+        # Client already has this data version; skip the database entirely
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response = await call_next(request)
+    if response.status_code == status.HTTP_200_OK:
+        response.headers.update(headers)
+    return response
+
 # --- LOGGING MIDDLEWARE ---
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    start_time = time.time()
+    start_time = time.perf_counter()
     response = await call_next(request)
-    process_time = time.time() - start_time
+    process_time = time.perf_counter() - start_time
     
     log_message = f"Method: {request.method} Path: {request.url.path} Status: {response.status_code} Duration: {process_time:.2f}s"
     logger.info(log_message)
@@ -68,119 +181,105 @@ def read_root():
 
 @app.get(
     "/api/reports/top-products", 
-    response_model=List[schemas.ProductMention], 
+    # Schema kept for the docs only; skipping response validation on this hot path
+    responses={200: {"model": List[schemas.ProductMention]}},
     tags=["Reports"],
     summary="Get Top Trending Products"
 )
-def get_top_products(
+@cache.cache(ttl=REPORT_CACHE_TTL, key="top-products:{limit}")
+async def get_top_products(
     limit: int = Query(10, gt=0, le=100, description="The number of top products to retrieve."), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Returns the most frequently mentioned terms/products across all channels.
-    Groups results by message text and sorts by count.
+    Reads pre-aggregated counts from the mv_top_products report table
+    and returns the JSON built by Postgres without re-serializing it.
     """
     logger.info(f"Generating Top Products report (limit={limit})")
-    sql = text("""
-        SELECT message_text AS term, COUNT(*) AS mention_count
-        FROM "raw".fct_messages
-        WHERE message_text IS NOT NULL
-        GROUP BY message_text
-        ORDER BY mention_count DESC
-        LIMIT :limit
-    """)
-    result = db.execute(sql, {"limit": limit}).mappings().all()
+    result = (await db.execute(TOP_PRODUCTS_SQL, {"limit": limit})).scalar()
     if not result:
         raise HTTPException(status_code=404, detail="No product data found.")
-    return result
+    return Response(content=result, media_type="application/json")
 
 
 @app.get(
     "/api/channels/{channel_name}/activity", 
-    response_model=List[schemas.ChannelActivity], 
+    # Rows are streamed, so the schema documents the shape without validating it
+    responses={200: {"model": List[schemas.ChannelActivity]}},
     tags=["Channels"],
     summary="Channel Activity Trends"
 )
-def get_channel_activity(
-    channel_name: str = Path(..., description="The name of the channel to analyze."),
-    db: Session = Depends(get_db)
+async def get_channel_activity(
+    channel_name: str = Path(..., description="The name of the channel to analyze.")
 ):
     """
     Returns daily posting activity and view trends for a specific channel.
-    Converts integer date keys into standard date formats.
+    Reads pre-aggregated daily totals from the mv_channel_activity report table
+    and streams them back as they are fetched.
     """
     logger.info(f"Retrieving activity for channel: {channel_name}")
-    sql = text("""
-        SELECT 
-            TO_DATE(m.date_key::TEXT, 'YYYYMMDD') AS day, 
-            COUNT(m.message_id) AS post_count,
-            COALESCE(SUM(m.view_count), 0) AS daily_views
-        FROM "raw".fct_messages m
-        JOIN "raw".dim_channels c ON m.channel_key = c.channel_key
-        WHERE c.channel_name = :channel_name
-        GROUP BY day
-        ORDER BY day DESC
-    """)
-    result = db.execute(sql, {"channel_name": channel_name}).mappings().all()
-    if not result:
-        raise HTTPException(status_code=404, detail=f"No activity found for channel: {channel_name}")
-    return result
+    return await stream_json_array(
+        CHANNEL_ACTIVITY_SQL,
+        {"channel_name": channel_name},
+        not_found_detail=f"No activity found for channel: {channel_name}"
+    )
 
 
 @app.get(
     "/api/search/messages", 
-    response_model=List[schemas.MessageSearch], 
+    # Rows are streamed, so the schema documents the shape without validating it
+    responses={200: {"model": List[schemas.MessageSearch]}},
     tags=["Search"],
     summary="Keyword Search"
 )
-def search_messages(
+async def search_messages(
     query: str = Query(..., min_length=3, description="The keyword or drug name to search for."),
     limit: int = Query(20, ge=1, le=100, description="Max results to return."),
-    db: Session = Depends(get_db)
+    after_date_key: Optional[int] = Query(None, description="Cursor: date_key of the last message on the previous page."),
+    after_message_id: Optional[int] = Query(None, description="Cursor: message_id of the last message on the previous page.")
 ):
     """
     Searches for messages containing a specific keyword (case-insensitive).
+    The substring match is served by the pg_trgm GIN index on message_text.
+    Pass the date_key and message_id of the last result to fetch the next page.
     """
     logger.info(f"Searching messages for keyword: {query}")
-    sql = text("""
-        SELECT 
-            message_id,
-            TO_DATE(date_key::TEXT, 'YYYYMMDD') AS date,
-            message_text,
-            COALESCE(view_count, 0) AS view_count
-        FROM "raw".fct_messages
-        WHERE message_text ILIKE :search_term
-        ORDER BY date_key DESC
-        LIMIT :limit
-    """)
-    return db.execute(sql, {"search_term": f"%{query}%", "limit": limit}).mappings().all()
+    if (after_date_key is None) != (after_message_id is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="after_date_key and after_message_id must be provided together."
+        )
+
+    # Escape LIKE wildcards so user input is matched literally and stays index-friendly
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    params = {"search_term": f"%{escaped}%", "limit": limit}
+
+    sql = SEARCH_MESSAGES_SQL
+    if after_date_key is not None:
+        sql = SEARCH_MESSAGES_AFTER_SQL
+        params.update(after_date_key=after_date_key, after_message_id=after_message_id)
+
+    return await stream_json_array(sql, params)
 
 
 @app.get(
     "/api/reports/visual-content", 
-    response_model=List[schemas.VisualStat], 
+    # Schema kept for the docs only; skipping response validation on this hot path
+    responses={200: {"model": List[schemas.VisualStat]}},
     tags=["Reports"],
     summary="YOLO Detection Statistics"
 )
-def get_visual_stats(db: Session = Depends(get_db)):
+@cache.cache(ttl=REPORT_CACHE_TTL, key="visual-content")
+async def get_visual_stats(db: AsyncSession = Depends(get_db)):
     """
     Returns statistics about image usage and YOLOv8 detection categories across channels.
-    Includes the most frequent object detected and average confidence scores.
+    Includes the most frequent object detected and average confidence scores,
+    read from the mv_visual_stats report table.
     """
     logger.info("Generating Visual Content Statistics report")
-    sql = text("""
-        SELECT 
-            c.channel_name,
-            COUNT(i.message_id) AS total_images,
-            MODE() WITHIN GROUP (ORDER BY i.detected_class) AS primary_category,
-            ROUND(AVG(i.confidence_score)::numeric, 2) AS avg_confidence
-        FROM "raw".fct_image_detections i
-        JOIN "raw".dim_channels c ON i.channel_key = c.channel_key
-        GROUP BY c.channel_name
-        ORDER BY total_images DESC
-    """)
     try:
-        return db.execute(sql).mappings().all()
+        return (await db.execute(VISUAL_STATS_SQL)).mappings().all()
     except Exception as e:
         logger.error(f"Error retrieving visual stats: {e}")
         raise HTTPException(status_code=500, detail="Visual detection data is currently unavailable.")
\ No newline at end of file
@@ -20,6 +20,7 @@ class ChannelActivity(BaseModel):
 # Endpoint 3: Message Search
 class MessageSearch(BaseModel):
     message_id: int
+    date_key: int
     date: date
     message_text: Optional[str] = None
     view_count: int
@@ -0,0 +1,39 @@
+import orjson
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from . import database
+
+
+async def stream_json_array(sql, params, not_found_detail=None):
+    """
+    Runs `sql` on a server-side cursor and streams the rows to the client as a JSON array,
+    so large results are never materialized in memory before the first byte is sent.
+    Raises 404 with `not_found_detail` when set and the query returns no rows.
+    The stream owns its connection, so it stays open until the last row is sent.
+    """
+    conn = await database.engine.connect()
+    try:
+        result = (await conn.stream(sql, params)).mappings()
+        first = await result.fetchone()
+    except Exception:
+        await conn.close()
+        raise
+
+    if first is None and not_found_detail:
+        await conn.close()
+        raise HTTPException(status_code=404, detail=not_found_detail)
+
+    async def body():
+        try:
+            if first is None:
+                yield b"[]"
+                return
+            yield b"[" + orjson.dumps(dict(first))
+            async for row in result:
+                yield b"," + orjson.dumps(dict(row))
+            yield b"]"
+        finally:
+            await conn.close()
+
+    return StreamingResponse(body(), media_type="application/json")
@@ -0,0 +1,7 @@
+-- Raises per-transaction sort/hash memory so Postgres can keep large
+-- GROUP BY / MODE() aggregations in a HashAggregate instead of spilling
+-- to an external sort. Use as a pre_hook on aggregate-heavy models.
+{% macro set_aggregate_memory(work_mem='256MB', hash_mem_multiplier=2.0) %}
+    SET LOCAL work_mem = '{{ work_mem }}';
+    SET LOCAL hash_mem_multiplier = {{ hash_mem_multiplier }};
+{% endmacro %}
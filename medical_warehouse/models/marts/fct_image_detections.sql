@@ -1,5 +1,9 @@
 {{ config(
-    materialized='table'
+    materialized='table',
+    indexes=[
+        {'columns': ['channel_key']},
+        {'columns': ['detected_at']}
+    ]
 ) }}
 
 
@@ -15,9 +19,10 @@ yolo_detections as(
     message_id,
     detected_class,
     confidence_score,
-    image_category
+    image_category,
+    detected_at
 
-    from {{ ref('yolo_detections') }}
+    from {{ source('raw', 'yolo_detections') }}
 )
 
 select 
@@ -26,7 +31,8 @@ m.channel_key,
 m.date_key,
 y.detected_class,
 y.confidence_score,
-y.image_category
+y.image_category,
+y.detected_at
 from message m
 join yolo_detections y
 on m.message_id = y.message_id
\ No newline at end of file
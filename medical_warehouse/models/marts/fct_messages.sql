@@ -1,4 +1,12 @@
-{{ config(materialized='table') }}
+{{ config(
+    materialized='table',
+    indexes=[
+        {'columns': ['channel_key']},
+        {'columns': ['date_key', 'message_id']},
+        {'columns': ['loaded_at']},
+        {'columns': ['message_text gin_trgm_ops'], 'type': 'gin'}
+    ]
+) }}
 
 WITH stg_msgs AS (
     -- Reference the staging layer
@@ -32,7 +40,10 @@ SELECT
     m.forward_count,
     
     -- 5. Logic Flags
-    m.is_media_attached AS has_image
+    m.is_media_attached AS has_image,
+
+    -- 6. Metadata (drives the API's ETag freshness check)
+    m.ingested_at AS loaded_at
 
 FROM stg_msgs m
 -- Join to get the Surrogate Key for the channel
@@ -0,0 +1,18 @@
+{{ config(
+    materialized='table',
+    pre_hook="{{ set_aggregate_memory() }}",
+    indexes=[
+        {'columns': ['channel_name', 'day'], 'unique': True}
+    ]
+) }}
+
+-- Daily posting activity per channel served by /api/channels/{channel_name}/activity
+SELECT
+    c.channel_name,
+    TO_DATE(m.date_key::TEXT, 'YYYYMMDD') AS day,
+    COUNT(m.message_id) AS post_count,
+    COALESCE(SUM(m.view_count), 0) AS daily_views
+FROM {{ ref('fct_messages') }} m
+JOIN {{ ref('dim_channels') }} c
+    ON m.channel_key = c.channel_key
+GROUP BY c.channel_name, day
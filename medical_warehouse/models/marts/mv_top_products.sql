@@ -0,0 +1,18 @@
+{{ config(
+    materialized='table',
+    pre_hook="{{ set_aggregate_memory() }}",
+    indexes=[
+        {'columns': ['term_hash'], 'unique': True},
+        {'columns': ['mention_count']}
+    ]
+) }}
+
+-- Pre-aggregated product mentions served by /api/reports/top-products
+SELECT
+    -- Unique key for the table; message text can exceed the btree row size limit
+    MD5(message_text) AS term_hash,
+    message_text AS term,
+    COUNT(*) AS mention_count
+FROM {{ ref('fct_messages') }}
+WHERE message_text IS NOT NULL
+GROUP BY message_text
@@ -0,0 +1,18 @@
+{{ config(
+    materialized='table',
+    pre_hook="{{ set_aggregate_memory() }}",
+    indexes=[
+        {'columns': ['channel_name'], 'unique': True}
+    ]
+) }}
+
+-- YOLO detection statistics per channel served by /api/reports/visual-content
+SELECT
+    c.channel_name,
+    COUNT(i.message_id) AS total_images,
+    MODE() WITHIN GROUP (ORDER BY i.detected_class) AS primary_category,
+    ROUND(AVG(i.confidence_score)::numeric, 2) AS avg_confidence
+FROM {{ ref('fct_image_detections') }} i
+JOIN {{ ref('dim_channels') }} c
+    ON i.channel_key = c.channel_key
+GROUP BY c.channel_name
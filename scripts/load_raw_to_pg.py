@@ -1,7 +1,9 @@
-import json
 import os
+import orjson
 import psycopg2
+from psycopg2.extras import execute_values
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -14,9 +16,29 @@ DB_NAME = os.getenv("DB_NAME", "medical_warehouse")
 DB_USER = os.getenv("DB_USER", "postgres")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 
+# Rows per multi-row INSERT statement
+BATCH_SIZE = 1000
+
+# Files handed to each parser process at a time
+PARSE_CHUNKSIZE = 8
+
 # Absolute path to your raw data
 DATA_ROOT = Path(r"C:\Users\hanif\Desktop\10Academy\Shipping-a-Data-Product-From-Raw-Telegram-Data-to-an-Analytical-API\data\raw\telegram_messages")
 
+# Landing table for YOLO detections (filled by src/yolo_detect.py, read by dbt)
+YOLO_DETECTIONS_DDL = """
+CREATE SCHEMA IF NOT EXISTS raw;
+
+CREATE TABLE IF NOT EXISTS raw.yolo_detections (
+    message_id        BIGINT,
+    channel_name      TEXT,
+    detected_class    TEXT,
+    confidence_score  DOUBLE PRECISION,
+    image_category    TEXT,
+    detected_at       TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
 # ─── CONNECTION ──────────────────────────────────────────────────────────────
 def connect_db():
     return psycopg2.connect(
@@ -27,7 +49,70 @@ def connect_db():
         password=DB_PASSWORD
     )
 
+# ─── DISCOVERY ───────────────────────────────────────────────────────────────
+def walk_json_files(root):
+    """
+    Recursively yields paths of message JSON files under root, skipping manifests.
+    os.scandir entries cache name and file type, so no extra stat call per file.
+    """
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                yield from walk_json_files(entry.path)
+            elif entry.is_file() and entry.name.endswith(".json") and not entry.name.startswith("_manifest"):
+                yield entry.path
+
+# ─── PARSING ─────────────────────────────────────────────────────────────────
+def parse_file(file_path):
+    """
+    Parses one JSON file into insert-ready row tuples.
+    Runs in a worker process, so it returns (file name, rows, error message)
+    and leaves all database work to the main process.
+    """
+    file_name = os.path.basename(file_path)
+    rows = []
+
+    try:
+        with open(file_path, "rb") as f:
+            data = orjson.loads(f.read())
+    except orjson.JSONDecodeError:
+        return file_name, rows, f"Skipping {file_name}: Invalid JSON format."
+    except Exception as e:
+        return file_name, rows, f"Error processing file {file_name}: {e}"
+
+    # Handle both list of objects and single object
+    messages = data if isinstance(data, list) else [data]
+    if not all(isinstance(msg, dict) for msg in messages):
+        return file_name, rows, f"Skipping {file_name}: Expected a list of message objects."
+
+    for msg in messages:
+        # MAPPING: JSON keys -> Python variables -> SQL columns
+        # Based on your JSON example provided
+        m_id = msg.get("message_id")
+        c_username = msg.get("channel_name")  # In your JSON it's channel_name
+        c_title = msg.get("channel_title")
+        m_date = msg.get("message_date")      # In your JSON it's message_date
+        m_text = msg.get("message_text")      # In your JSON it's message_text
+        m_views = msg.get("views") or 0
+        m_forwards = msg.get("forwards") or 0
+        m_has_media = msg.get("has_media") or False
+        m_image = msg.get("image_path")
+
+        if m_id is None or c_username is None:
+            continue
+
+        rows.append((
+            m_id, c_username, c_title, m_date,
+            m_text, m_views, m_forwards, m_has_media, m_image
+        ))
+
+    return file_name, rows, None
+
 def main():
+    # Fail loudly rather than "load" nothing from a misconfigured path
+    if not DATA_ROOT.is_dir():
+        raise FileNotFoundError(f"Raw data directory not found: {DATA_ROOT}")
+
     conn = connect_db()
     cur = conn.cursor()
 
@@ -49,70 +134,51 @@ def main():
         PRIMARY KEY (message_id, channel_username)
     );
     """)
+    # Created here too so dbt's source('raw', 'yolo_detections') exists on a fresh database
+    cur.execute(YOLO_DETECTIONS_DDL)
     conn.commit()
 
     inserted = 0
     skipped = 0
 
     # ─── LOAD ALL JSON FILES ─────────────────────────────────────────────────
-    # rglob("*.json") scans all subfolders for .json files
-    for file_path in DATA_ROOT.rglob("*.json"):
-        if "_manifest.json" in file_path.name:
-            continue
-
-        print(f"Loading {file_path.name} ...")
-
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                
-                # Handle both list of objects and single object
-                messages = data if isinstance(data, list) else [data]
-
-                for msg in messages:
-                    try:
-                        # MAPPING: JSON keys -> Python variables -> SQL columns
-                        # Based on your JSON example provided
-                        m_id = msg.get("message_id")
-                        c_username = msg.get("channel_name")  # In your JSON it's channel_name
-                        c_title = msg.get("channel_title")
-                        m_date = msg.get("message_date")      # In your JSON it's message_date
-                        m_text = msg.get("message_text")      # In your JSON it's message_text
-                        m_views = msg.get("views") or 0
-                        m_forwards = msg.get("forwards") or 0
-                        m_has_media = msg.get("has_media") or False
-                        m_image = msg.get("image_path")
-
-                        if m_id is None or c_username is None:
-                            continue
-
-                        cur.execute("""
-                        INSERT INTO raw.telegram_messages (
-                            message_id, channel_username, channel_title, date,
-                            text, views, forwards, has_media, image_path
-                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                        ON CONFLICT (message_id, channel_username) DO NOTHING;
-                        """, (
-                            m_id, c_username, c_title, m_date,
-                            m_text, m_views, m_forwards, m_has_media, m_image
-                        ))
-
-                        if cur.rowcount > 0:
-                            inserted += 1
-                        else:
-                            skipped += 1 # Duplicate record
-                            
-                    except Exception as e:
-                        print(f"  Error record {msg.get('message_id')}: {e}")
-                        skipped += 1
-
-            # Commit after each file is processed
-            conn.commit()
-
-        except json.JSONDecodeError:
-            print(f"  Skipping {file_path.name}: Invalid JSON format.")
-        except Exception as e:
-            print(f"  Error processing file {file_path.name}: {e}")
+    # Single scandir pass over all subfolders for .json files
+    file_paths = list(walk_json_files(DATA_ROOT))
+
+    # Worker processes parse files in parallel while this process inserts
+    # each file's rows as soon as its result is ready
+    with ProcessPoolExecutor() as pool:
+        for file_name, rows, error in pool.map(parse_file, file_paths, chunksize=PARSE_CHUNKSIZE):
+            print(f"Loading {file_name} ...")
+            if error:
+                print(f"  {error}")
+                continue
+
+            try:
+                # One round-trip per batch instead of per message;
+                # RETURNING tells us which rows were new vs. duplicates
+                if rows:
+                    new_rows = execute_values(cur, """
+                    INSERT INTO raw.telegram_messages (
+                        message_id, channel_username, channel_title, date,
+                        text, views, forwards, has_media, image_path
+                    ) VALUES %s
+                    ON CONFLICT (message_id, channel_username) DO NOTHING
+                    RETURNING message_id;
+                    """, rows, page_size=BATCH_SIZE, fetch=True)
+
+                    inserted += len(new_rows)
+                    skipped += len(rows) - len(new_rows) # Duplicate records
+
+                # Commit after each file is processed
+                conn.commit()
+
+            except Exception as e:
+                # Discard the failed batch so the next file starts a clean transaction;
+                # none of this file's rows were stored, so all of them count as skipped
+                conn.rollback()
+                skipped += len(rows)
+                print(f"  Error processing file {file_name}: {e}")
 
     cur.close()
     conn.close()
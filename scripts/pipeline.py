@@ -1,14 +1,21 @@
 import subprocess
 import os
+import sys
 from pathlib import Path
 from dagster import op, graph, ScheduleDefinition, Definitions, RetryPolicy
+from dbt.cli.main import dbtRunner
+
+# Make `scripts.*` and `src.*` importable when Dagster loads this file directly
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+# The loader runs in-process instead of spawning a second interpreter
+from scripts.load_raw_to_pg import main as load_main
 
 # Paths to your existing scripts
-BASE_DIR = Path(__file__).resolve().parent
-SCRAPER_PATH = BASE_DIR / "scripts/telegram.py"
-LOADER_PATH = BASE_DIR / "scripts/load_raw_to_pg.py"
-DBT_PROJECT_DIR = BASE_DIR / "medical_warehouse"
-YOLO_SCRIPT_PATH = BASE_DIR / "src/yolo_detection.py"
+SCRAPER_PATH = PROJECT_ROOT / "scripts/telegram.py"
+DBT_PROJECT_DIR = PROJECT_ROOT / "medical_warehouse"
 
 # Standard Retry Policy for production stability
 standard_retry = RetryPolicy(max_retries=3, delay=60) # 3 retries, 1 min apart
@@ -27,37 +34,50 @@ def scrape_telegram_data():
     retry_policy=standard_retry
 )
 def load_raw_to_postgres(upstream_status: str):
-    """Executes the script that populates raw.fct_messages."""
-    subprocess.run(["python", str(LOADER_PATH)], check=True)
+    """Runs the loader that populates raw.telegram_messages."""
+    load_main()
     return "Loading complete"
 
 @op(
-    description="Step 3: Run dbt models to transform raw data into the Gold layer.",
+    description="Step 3: Run YOLOv8 object detection on images and store results.",
     retry_policy=standard_retry
 )
-def run_dbt_transformations(upstream_status: str):
-    """Executes dbt run to build analytical marts (fct_messages, dim_channels)."""
-    # Note: Ensure dbt is in your path or virtualenv
-    subprocess.run(["dbt", "run", "--project-dir", str(DBT_PROJECT_DIR)], check=True)
-    return "Transformations complete"
+def run_yolo_enrichment(upstream_status: str):
+    """Enriches data by detecting medical objects in images."""
+    # Imported here so loading the Dagster code location doesn't pull in torch/ultralytics
+    from src.yolo_detect import main as yolo_main
+    yolo_main()
+    return "YOLO enrichment complete"
 
 @op(
-    description="Step 4: Run YOLOv8 object detection on images and store results.",
+    description="Step 4: Run dbt models to transform raw data into the Gold layer.",
     retry_policy=standard_retry
 )
-def run_yolo_enrichment(upstream_status: str):
-    """Enriches data by detecting medical objects in images."""
-    subprocess.run(["python", str(YOLO_SCRIPT_PATH)], check=True)
-    return "YOLO enrichment complete"
+def run_dbt_transformations(upstream_status: str):
+    """Executes dbt run to build analytical marts and the mv_* report tables."""
+    # dbt's Python API avoids spawning a second interpreter for the CLI
+    res = dbtRunner().invoke(["run", "--project-dir", str(DBT_PROJECT_DIR)])
+    if not res.success:
+        # res.exception is only set for crashes; model/test failures are in res.result
+        if res.exception is not None:
+            raise RuntimeError(f"dbt run failed: {res.exception}")
+        failed = [
+            f"{r.node.name} ({r.status}): {r.message}"
+            for r in res.result
+            if str(r.status) in ("error", "fail")
+        ]
+        raise RuntimeError("dbt run failed for: " + "; ".join(failed))
+    return "Transformations complete"
 
 @graph
 def medical_warehouse_pipeline():
-    """Full Pipeline: Scrape → Load → dbt → YOLO."""
-    # We pass the status string to ensure sequential execution
+    """Full Pipeline: Scrape → Load → YOLO → dbt (also rebuilds the report tables)."""
+    # We pass the status string to ensure sequential execution;
+    # YOLO runs before dbt so fct_image_detections sees this run's detections
     scraped = scrape_telegram_data()
     loaded = load_raw_to_postgres(scraped)
-    transformed = run_dbt_transformations(loaded)
-    run_yolo_enrichment(transformed)
+    enriched = run_yolo_enrichment(loaded)
+    run_dbt_transformations(enriched)
 
 # Create the job from the graph
 medical_job = medical_warehouse_pipeline.to_job(name="medical_warehouse_job")
@@ -1,47 +1,139 @@
+import io
 import os
-import pandas as pd
+import csv
+import sys
+import torch
+from pathlib import Path
 from ultralytics import YOLO
 
-# Load the lightweight YOLOv8 nano model
-model = YOLO('yolov8n.pt')
+# Allow running this file directly: `python src/yolo_detect.py`
+# by adding the project root to PYTHONPATH so `import scripts.*` works.
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
 
-def detect_and_classify(image_path):
-    results = model(image_path)
-    detections = results[0].boxes.data.tolist() # [x1, y1, x2, y2, conf, class_id]
-    
+from scripts.load_raw_to_pg import connect_db, YOLO_DETECTIONS_DDL
+
+IMAGE_ROOT = 'data/raw/images/'
+
+# Detections are streamed into a staging table during inference, then swapped into
+# raw.yolo_detections (read by dbt as a source) in one short transaction
+DETECTION_COLUMNS = ["message_id", "channel_name", "detected_class", "confidence_score", "image_category"]
+STAGING_TABLE = "raw.yolo_detections_staging"
+COPY_SQL = f"COPY {STAGING_TABLE} ({', '.join(DETECTION_COLUMNS)}) FROM STDIN WITH CSV"
+
+# Rows buffered per COPY + commit
+COPY_BATCH_ROWS = 10_000
+
+# Images sent to the model per forward pass
+BATCH_SIZE = 32
+
+# Use the GPU (with half precision) when one is available
+DEVICE = 0 if torch.cuda.is_available() else "cpu"
+HALF = DEVICE != "cpu"
+
+_model = None
+
+def get_model():
+    """Loads the YOLOv8 nano model once per process."""
+    global _model
+    if _model is None:
+        # Load the lightweight YOLOv8 nano model and fuse Conv+BN layers once up front
+        _model = YOLO('yolov8n.pt')
+        _model.fuse()
+    return _model
+
+def classify_detections(detections):
     # YOLOv8 default classes: 0 = person, 39 = bottle, 41 = cup (common for containers)
     has_person = any(int(d[5]) == 0 for d in detections)
     has_product = any(int(d[5]) in [39, 41] for d in detections)
     
     # Classification Logic
     if has_person and has_product:
-        return "promotional", detections
+        return "promotional"
     elif has_product:
-        return "product_display", detections
+        return "product_display"
     elif has_person:
-        return "lifestyle", detections
+        return "lifestyle"
     else:
-        return "other", detections
-
-# Process images and save to CSV
-data = []
-image_root = 'data/raw/images/'
-
-for channel in os.listdir(image_root):
-    channel_path = os.path.join(image_root, channel)
-    for img_name in os.listdir(channel_path):
-        msg_id = img_name.split('.')[0]
-        img_path = os.path.join(channel_path, img_name)
-        
-        category, raw_hits = detect_and_classify(img_path)
-        
-        for hit in raw_hits:
-            data.append({
-                "message_id": msg_id,
-                "channel_name": channel,
-                "detected_class": model.names[int(hit[5])],
-                "confidence_score": hit[4],
-                "image_category": category
-            })
-
-pd.DataFrame(data).to_csv('medical_warehouse/seeds/yolo_detections.csv', index=False)
\ No newline at end of file
+        return "other"
+
+def detect_in_batches(model, image_paths):
+    """
+    Yields one YOLO result per image, running the model on BATCH_SIZE paths at a time.
+    Ultralytics decodes a whole list source up front and runs it as a single batch,
+    so slicing here is what bounds memory use.
+    """
+    for start in range(0, len(image_paths), BATCH_SIZE):
+        yield from model(image_paths[start:start + BATCH_SIZE], device=DEVICE, half=HALF)
+
+def copy_rows(conn, rows):
+    """Streams a batch of detection tuples into Postgres with COPY and commits it."""
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    buf.seek(0)
+    with conn.cursor() as cur:
+        cur.copy_expert(COPY_SQL, buf)
+    conn.commit()
+
+def publish_detections(conn):
+    """Replaces raw.yolo_detections with the staged rows atomically, then drops staging."""
+    columns = ", ".join(DETECTION_COLUMNS + ["detected_at"])
+    with conn.cursor() as cur:
+        cur.execute("TRUNCATE raw.yolo_detections;")
+        cur.execute(f"INSERT INTO raw.yolo_detections ({columns}) SELECT {columns} FROM {STAGING_TABLE};")
+        cur.execute(f"DROP TABLE {STAGING_TABLE};")
+    conn.commit()
+
+def main():
+    model = get_model()
+
+    # Collect every image first so the model can run them in batches
+    image_paths = []
+    image_meta = []
+    # scandir entries carry name/path/type, avoiding a stat and path join per image
+    with os.scandir(IMAGE_ROOT) as channels:
+        for channel in channels:
+            if not channel.is_dir():
+                continue
+            with os.scandir(channel.path) as images:
+                for img in images:
+                    # Images are saved as {message_id}.jpg by the scraper
+                    if img.is_file() and img.name.split('.')[0].isdigit():
+                        image_paths.append(img.path)
+                        image_meta.append((img.name.split('.')[0], channel.name))
+
+    results = detect_in_batches(model, image_paths)
+
+    conn = connect_db()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(YOLO_DETECTIONS_DDL)
+            # A fresh staging table per run; readers of raw.yolo_detections are untouched
+            cur.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE};")
+            cur.execute(f"CREATE UNLOGGED TABLE {STAGING_TABLE} (LIKE raw.yolo_detections INCLUDING DEFAULTS);")
+        conn.commit()
+
+        # COPY detections in batches as images finish instead of buffering them all
+        rows = []
+        for result, (msg_id, channel) in zip(results, image_meta):
+            raw_hits = result.boxes.data.tolist() # [x1, y1, x2, y2, conf, class_id]
+            category = classify_detections(raw_hits)
+
+            rows.extend(
+                (msg_id, channel, model.names[int(hit[5])], hit[4], category)
+                for hit in raw_hits
+            )
+            if len(rows) >= COPY_BATCH_ROWS:
+                copy_rows(conn, rows)
+                rows = []
+
+        copy_rows(conn, rows)
+
+        # Every run re-detects all images, so the staged rows replace the previous results
+        publish_detections(conn)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()